@@ -1,6 +1,7 @@
 # pydres/__init__.py
 
-from .const import BUILTIN_TYPES, SPECIAL_TYPES
+from .const import BUILTIN_TYPES, SPECIAL_TYPES, NON_CUSTOM_NAMES
+from .exceptions import CircularDependencyError
 from .regexp import special_type_pattern
 from .main import get_first_custom_init, is_custom_class_string_annotation, find_class_in_module, \
 	resolve_dependency_from_overrides, resolve_dependency, instantiate_with_dependencies, is_builtin_type, \
@@ -9,6 +10,8 @@ from .main import get_first_custom_init, is_custom_class_string_annotation, find
 __all__ = [
 	"BUILTIN_TYPES",
 	"SPECIAL_TYPES",
+	"NON_CUSTOM_NAMES",
+	"CircularDependencyError",
 	"special_type_pattern",
 	"resolve_dependency",
 	"instantiate_with_dependencies",
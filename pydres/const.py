@@ -1,6 +1,4 @@
-import builtins
-
-SPECIAL_TYPES = {
+SPECIAL_TYPES = frozenset({
 	"Any",
 	"Union",
 	"TypeVar",
@@ -14,6 +12,106 @@ SPECIAL_TYPES = {
 	"Dict",
 	"Set",
 	"Tuple"
-}
+})
+
+# Names of the types in the builtins module of every supported Python version (3.9 - 3.13)
+BUILTIN_TYPES = frozenset({
+	"ArithmeticError",
+	"AssertionError",
+	"AttributeError",
+	"BaseException",
+	"BaseExceptionGroup",
+	"BlockingIOError",
+	"BrokenPipeError",
+	"BufferError",
+	"BuiltinImporter",
+	"BytesWarning",
+	"ChildProcessError",
+	"ConnectionAbortedError",
+	"ConnectionError",
+	"ConnectionRefusedError",
+	"ConnectionResetError",
+	"DeprecationWarning",
+	"EOFError",
+	"EncodingWarning",
+	"Exception",
+	"ExceptionGroup",
+	"FileExistsError",
+	"FileNotFoundError",
+	"FloatingPointError",
+	"FutureWarning",
+	"GeneratorExit",
+	"ImportError",
+	"ImportWarning",
+	"IndentationError",
+	"IndexError",
+	"InterruptedError",
+	"IsADirectoryError",
+	"KeyError",
+	"KeyboardInterrupt",
+	"LookupError",
+	"MemoryError",
+	"ModuleNotFoundError",
+	"NameError",
+	"NotADirectoryError",
+	"NotImplementedError",
+	"OSError",
+	"OverflowError",
+	"PendingDeprecationWarning",
+	"PermissionError",
+	"ProcessLookupError",
+	"PythonFinalizationError",
+	"RecursionError",
+	"ReferenceError",
+	"ResourceWarning",
+	"RuntimeError",
+	"RuntimeWarning",
+	"StopAsyncIteration",
+	"StopIteration",
+	"SyntaxError",
+	"SyntaxWarning",
+	"SystemError",
+	"SystemExit",
+	"TabError",
+	"TimeoutError",
+	"TypeError",
+	"UnboundLocalError",
+	"UnicodeDecodeError",
+	"UnicodeEncodeError",
+	"UnicodeError",
+	"UnicodeTranslateError",
+	"UnicodeWarning",
+	"UserWarning",
+	"ValueError",
+	"Warning",
+	"ZeroDivisionError",
+	"_IncompleteInputError",
+	"bool",
+	"bytearray",
+	"bytes",
+	"classmethod",
+	"complex",
+	"dict",
+	"enumerate",
+	"filter",
+	"float",
+	"frozenset",
+	"int",
+	"list",
+	"map",
+	"memoryview",
+	"object",
+	"property",
+	"range",
+	"reversed",
+	"set",
+	"slice",
+	"staticmethod",
+	"str",
+	"super",
+	"tuple",
+	"type",
+	"zip"
+})
 
-BUILTIN_TYPES = {type_.__name__ for type_ in vars(builtins).values() if isinstance(type_, type)}
\ No newline at end of file
+NON_CUSTOM_NAMES = BUILTIN_TYPES | SPECIAL_TYPES
\ No newline at end of file
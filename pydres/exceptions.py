@@ -0,0 +1,5 @@
+class CircularDependencyError(RecursionError):
+	"""
+	Raised when a class depends on itself through its dependencies.
+	It is a RecursionError, so code written for the former recursive resolution keeps working.
+	"""
@@ -1,29 +1,75 @@
 import importlib
 import inspect
+import sys
+import weakref
+from functools import lru_cache
 from inspect import Parameter
-from typing import Any, Type, Dict, Union, Optional, Callable, TypeVar
+from typing import Any, Type, Dict, Union, Optional, Callable, TypeVar, Tuple, NamedTuple
 
-from pydres.const import BUILTIN_TYPES, SPECIAL_TYPES
-from pydres.regexp import special_type_pattern
+from pydres.const import BUILTIN_TYPES, NON_CUSTOM_NAMES, SPECIAL_TYPES
+from pydres.exceptions import CircularDependencyError
+from pydres.regexp import _identifier_pattern
 
 T = TypeVar("T", bound=Any)
 DependencyResolverOverrides = Dict[Union[Type, str], Any]
 
+_MISSING = object()
+_SLOT_WRAPPER_TYPE = type(object.__init__)
+
+# Kinds of a parameter in a resolution plan
+_DEFAULT = 0  # Builtin type, special type or no annotation, so only an override or the default is used
+_CUSTOM_CLASS = 1  # The dependency is a non-builtin class, which is created recursively
+_STRING_REFERENCE = 2  # The annotation is a string reference to a class, which is looked up on every instantiation
+
+
+class _ResolutionPlan(NamedTuple):
+	"""
+	Precomputed resolution of the __init__ parameters of a class
+	init_attribute returns the __init__ attribute of the class when the plan was built,
+	or None once it has been garbage collected.
+	module_name is the module of the class, in which string references are looked up.
+	The other fields are tuples with one entry per parameter, so resolving only indexes plain tuples.
+	"""
+	init_attribute: Callable[[], Optional[Callable[..., None]]]
+	module_name: str
+	names: Tuple[str, ...]
+	annotations: Tuple[Any, ...]
+	defaults: Tuple[Any, ...]
+	kinds: Tuple[int, ...]
+
+
+# Weak keys so that caching does not keep user classes alive
+_plan_cache: "weakref.WeakKeyDictionary[type, _ResolutionPlan]" = weakref.WeakKeyDictionary()
+
+
+def _signature_params(init_method: Callable[..., None]) -> Tuple[Tuple[str, Parameter], ...]:
+	"""
+	Get the (name, parameter) pairs of an __init__ method.
+	It is only called when a resolution plan is built, so the signature is not cached separately.
+	"""
+	signature = getattr(init_method, '__signature__', None)
+	if not isinstance(signature, inspect.Signature):
+		signature = inspect.signature(init_method)
+	return tuple(signature.parameters.items())
+
 
 def get_first_custom_init(original_class: Type[Any]) -> Optional[Callable[..., None]]:
 	"""
 	Get the first custom __init__ method in the class hierarchy
 	"""
-	for cls in inspect.getmro(original_class):
+	for cls in original_class.__mro__:
+		# The MRO always ends with object, whose __init__ is never custom
+		if cls is object:
+			break
 		init_method = cls.__dict__.get('__init__')
-		if init_method and not isinstance(init_method, type(object.__init__)):
+		if init_method and type(init_method) is not _SLOT_WRAPPER_TYPE:
 			return init_method
 	return None
 
 
 def is_builtin_type(param_type: Any) -> bool:
 	"""Check if a param type is a built-in type"""
-	return inspect.isclass(param_type) and param_type.__name__ in BUILTIN_TYPES
+	return isinstance(param_type, type) and param_type.__name__ in BUILTIN_TYPES
 
 
 def is_custom_class(param_type: Any) -> bool:
@@ -31,17 +77,7 @@ def is_custom_class(param_type: Any) -> bool:
 	Check if a param type is a custom class.
 	It must not be a built-in type or a special type like Union or Optional.
 	"""
-
-	if not inspect.isclass(param_type):
-		return False
-
-	if is_builtin_type(param_type):
-		return False
-
-	if param_type.__name__ in SPECIAL_TYPES:
-		return False
-
-	return True
+	return isinstance(param_type, type) and param_type.__name__ not in NON_CUSTOM_NAMES
 
 
 def is_custom_class_string_annotation(param: Parameter) -> bool:
@@ -49,12 +85,28 @@ def is_custom_class_string_annotation(param: Parameter) -> bool:
 	Check if a parameter is a string type annotation for a custom class,
 	excluding special types and built-in types.
 	"""
-	annotation = param.annotation
+	return _classify_annotation(param.annotation)
+
+
+def _classify_annotation(annotation: Any) -> bool:
+	"""Check if an annotation is a string reference to a custom class"""
 	if not isinstance(annotation, str):
 		return False
 
+	return _classify_string_annotation(annotation)
+
+
+@lru_cache(maxsize=2048)
+def _classify_string_annotation(annotation: str) -> bool:
+	"""
+	Check if a string annotation refers to a custom class.
+	Only strings are cached, so class annotations are not kept alive by the cache.
+	"""
 	# Check if it's a built-in type or special type using exact matches
-	if annotation in BUILTIN_TYPES or special_type_pattern.search(annotation):
+	if annotation in BUILTIN_TYPES:
+		return False
+
+	if not SPECIAL_TYPES.isdisjoint(_identifier_pattern.findall(annotation)):
 		return False
 
 	# If it's not built-in or special, it's likely a custom class string annotation
@@ -75,24 +127,39 @@ def find_class_in_module(parent_class: Type[Any], class_name: str) -> Optional[T
 	Raises:
 		AttributeError: If the class is not found in the module or is not a valid class.
 	"""
-	# Get the module where `parent_class` is defined
-	module = importlib.import_module(parent_class.__module__)
+	return _find_class(parent_class.__module__, class_name)
+
+
+def _find_class(module_name: str, class_name: str) -> Type[Any]:
+	"""
+	Find a class by name within the given module.
+	sys.modules already caches the module. The attribute is read on every call, so rebinding it takes effect.
+	"""
+	# Get the module where the parent class is defined, which has normally been imported already
+	module = sys.modules.get(module_name)
+	if module is None:
+		module = importlib.import_module(module_name)
 
 	# Try to retrieve `class_name` from the module
 	potential_class = getattr(module, class_name, None)
 
 	# Raise an error if the class is not found
 	if potential_class is None:
-		raise AttributeError(f"Class '{class_name}' not found in module '{parent_class.__module__}'")
+		raise AttributeError(f"Class '{class_name}' not found in module '{module_name}'")
 
 	# Check if the retrieved attribute is a class
 	if not inspect.isclass(potential_class):
-		raise AttributeError(f"Found '{class_name}' in module '{parent_class.__module__}', but it is not a class.")
+		raise AttributeError(f"Found '{class_name}' in module '{module_name}', but it is not a class.")
 
 	# Return the resolved class if valid
 	return potential_class
 
 
+def _has_class_keys(overrides: DependencyResolverOverrides) -> bool:
+	"""Check if any override is keyed by something other than a parameter name or string annotation"""
+	return any(not isinstance(key, str) for key in overrides)
+
+
 def resolve_dependency_from_overrides(
 		original_class: Type[Any],
 		name: str,
@@ -103,70 +170,290 @@ def resolve_dependency_from_overrides(
 	Check if dependency is provided in overrides by name or type
 	Raises: AttributeError: If the dependency is a string reference and the class is not found
 	"""
-	if name in overrides:  # Check if the dependency is provided by name
-		return overrides[name]
-	elif param.annotation in overrides:  # Check if the dependency is provided by type
-		return overrides[param.annotation]
-	elif is_custom_class_string_annotation(param):  # Check if the dependency is a string reference
-		referenced_class = find_class_in_module(original_class, param.annotation)
-		if referenced_class in overrides:
-			return overrides[referenced_class]
+	if not overrides:
+		return None
 
-	return None
+	# Only string references are looked up by class, so the overrides are only scanned for class keys for them
+	annotation = param.annotation
+	by_class = _classify_annotation(annotation) and _has_class_keys(overrides)
+	override, _ = _resolve_override(name, annotation, original_class.__module__, overrides, by_class)
+	return override
 
 
 def resolve_dependency(
-		original_class: Type[T], name: str, param: Parameter, overrides: DependencyResolverOverrides
+		original_class: Type[T],
+		name: str,
+		param: Parameter,
+		overrides: DependencyResolverOverrides,
+		instance_cache: Optional[Dict[Type, Any]] = None
 ) -> Any:
-	"""Resolve a single dependency, either from overrides or by recursively creating it."""
+	"""
+	Resolve a single dependency, either from overrides or by recursively creating it.
+	If instance_cache is given, created classes are reused from and stored in it.
+	"""
 	if name == "self":
 		return None
 
+	# The parameter is resolved like any parameter of a resolution plan
+	annotation = param.annotation
+	kind = _classify_parameter(annotation)
+	create, value = _resolve_step(
+		name,
+		annotation,
+		param.default if param.default is not param.empty else None,
+		kind,
+		original_class.__module__,
+		overrides,
+		kind == _STRING_REFERENCE and _has_class_keys(overrides)
+	)
+	if not create:
+		return value
+
+	# Recursively resolve the dependency as it's a non-builtin class.
+	# The dependency graph needs the class keys of all overrides, which are scanned once for the whole graph.
+	if instance_cache is None:
+		return instantiate_with_dependencies(value, overrides)
+	if value not in instance_cache:
+		instance_cache[value] = _instantiate(value, overrides, instance_cache, _has_class_keys(overrides))
+	return instance_cache[value]
+
+
+def _classify_parameter(annotation: Any) -> int:
+	"""Classify a parameter once, so that only overrides have to be consulted on instantiation."""
+	if _classify_annotation(annotation):
+		# String references are resolved on every instantiation, so rebinding the class in its module takes effect
+		return _STRING_REFERENCE
+
+	return _CUSTOM_CLASS if is_custom_class(annotation) else _DEFAULT
+
+
+def _reference(init_method: Optional[Callable[..., None]]) -> Callable[[], Optional[Callable[..., None]]]:
+	"""Reference __init__ weakly where possible, since an __init__ calling super() refers back to its class."""
+	try:
+		return weakref.ref(init_method)
+	except TypeError:
+		return lambda: init_method
+
+
+def _takes_only_self(init_method: Callable[..., None]) -> bool:
+	"""Check from the code object if __init__ takes only self, without building its signature."""
+	code = getattr(init_method, '__code__', None)
+	if code is None or hasattr(init_method, '__signature__'):
+		return False
+	return (
+		code.co_argcount == 1
+		and code.co_kwonlyargcount == 0
+		and not code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS)
+	)
+
+
+def _get_resolution_plan(original_class: Type[Any]) -> _ResolutionPlan:
+	"""
+	Get the resolution plan for the __init__ arguments of a class
+	The plan is cached per class and rebuilt when the __init__ of the class is replaced.
+	"""
+	# The interpreter looks __init__ up through the MRO with its type attribute cache, so this is cheaper
+	# than get_first_custom_init. It changes whenever __init__ is replaced on the class or a base class.
+	init_attribute = original_class.__init__
+
+	plan = _plan_cache.get(original_class)
+	if plan is not None and plan.init_attribute() is init_attribute:
+		return plan
+
+	# Check if __init__ is overridden by user
+	init_method = get_first_custom_init(original_class)
+
+	if not init_method or _takes_only_self(init_method):
+		# If __init__ is not overridden or takes no arguments, the class is instantiated without arguments
+		params = []
+	else:
+		params = [(name, param) for name, param in _signature_params(init_method) if name != "self"]
+
+	annotations = tuple(param.annotation for _, param in params)
+	plan = _ResolutionPlan(
+		init_attribute=_reference(init_attribute),
+		module_name=original_class.__module__,
+		names=tuple(name for name, _ in params),
+		annotations=annotations,
+		defaults=tuple(param.default if param.default is not param.empty else None for _, param in params),
+		kinds=tuple(_classify_parameter(annotation) for annotation in annotations),
+	)
+
+	_plan_cache[original_class] = plan
+	return plan
+
+
+def _resolve_step(
+		name: str,
+		annotation: Any,
+		default: Any,
+		kind: int,
+		module_name: str,
+		overrides: DependencyResolverOverrides,
+		has_class_keys: bool
+) -> Tuple[bool, Any]:
+	"""
+	Resolve a single parameter from overrides or defaults, with the kind classified by _classify_parameter.
+	Returns (True, class) when the dependency has to be created, otherwise (False, value).
+	"""
 	# Step 1: Check if an override exists for this dependency
-	override = resolve_dependency_from_overrides(original_class, name, param, overrides)
-	if override is not None:
-		return override
+	if overrides:
+		override, dependency = _resolve_override(
+			name, annotation, module_name, overrides, has_class_keys and kind == _STRING_REFERENCE
+		)
+		if override is not None:
+			return False, override
+		if dependency is not None:
+			# The string reference was already resolved to look up the overrides
+			return _create_or_default(dependency, default)
 
-	# Step 2: Resolve string-based class references to actual types
-	dependency = param.annotation
-	if is_custom_class_string_annotation(param):
-		dependency = find_class_in_module(original_class, dependency)
+	# Step 2: Dispatch on the precomputed kind
+	return _HANDLERS[kind](annotation, default, module_name)
 
-	# Step 3: Recursively resolve the dependency if it's a non-builtin class
+
+def _resolve_override(
+		name: str,
+		annotation: Any,
+		module_name: str,
+		overrides: DependencyResolverOverrides,
+		by_class: bool
+) -> Tuple[Optional[Any], Optional[Type[Any]]]:
+	"""
+	Look up a single parameter in overrides by name, by type or by the referenced class
+	by_class tells if the annotation is a string reference and any override is keyed by a class.
+	Returns the override and the referenced class, if the string reference had to be resolved for the lookup.
+	Raises: AttributeError: If the dependency is a string reference and the class is not found
+	"""
+	if not overrides:
+		return None, None
+
+	override = overrides.get(name, _MISSING)  # Check if the dependency is provided by name
+	if override is not _MISSING:
+		return override, None
+
+	override = overrides.get(annotation, _MISSING)  # Check if the dependency is provided by type
+	if override is not _MISSING:
+		return override, None
+
+	# Check if the dependency is a string reference, which can only match overrides keyed by class
+	if by_class:
+		dependency = _find_class(module_name, annotation)
+		return overrides.get(dependency), dependency
+
+	return None, None
+
+
+def _use_default(annotation: Any, default: Any, module_name: str) -> Tuple[bool, Any]:
+	"""Use the default parameter if available"""
+	return False, default
+
+
+def _create_dependency(annotation: Any, default: Any, module_name: str) -> Tuple[bool, Any]:
+	"""The dependency has to be created as it's a non-builtin class"""
+	return True, annotation
+
+
+def _resolve_reference(annotation: Any, default: Any, module_name: str) -> Tuple[bool, Any]:
+	"""Resolve a string-based class reference, then create it or use the default"""
+	return _create_or_default(_find_class(module_name, annotation), default)
+
+
+def _create_or_default(dependency: Type[Any], default: Any) -> Tuple[bool, Any]:
+	"""Create a referenced class if it's a non-builtin class, otherwise use the default"""
 	if is_custom_class(dependency):
-		return instantiate_with_dependencies(dependency, overrides)
+		return True, dependency
+	return False, default
+
 
-	# Step 5: Use the default parameter if available
-	return param.default if param.default is not param.empty else None
+# Handlers of the parameters in a resolution plan, indexed by their kind.
+# They take the annotation, the default and the module in which string references are looked up.
+_HANDLERS = (
+	_use_default,  # _DEFAULT
+	_create_dependency,  # _CUSTOM_CLASS
+	_resolve_reference,  # _STRING_REFERENCE
+)
 
 
 def instantiate_with_dependencies(
 		original_class: Type[T],
-		overrides: DependencyResolverOverrides = None
+		overrides: DependencyResolverOverrides = None,
+		cache_shared: bool = False
 ) -> T:
 	"""
 	Create a service with dependencies
-	This method will recursively resolve dependencies for the service.
+	This method will resolve dependencies for the service down the whole dependency graph.
 	And classes will be resolved with overrides if provided.
 	Overrides can be specified as a dictionary with class references or strings as parameter name.
+	If cache_shared is True, a class is created once and the instance is shared wherever it is a dependency.
+	Raises: CircularDependencyError: If a class depends on itself through its dependencies
 	"""
 	if overrides is None:
 		overrides = {}
 
-	# Check if __init__ is overridden by user
-	init_method = get_first_custom_init(original_class)
-
-	if not init_method:
-		# If __init__ is not overridden, directly instantiate the class
-		return original_class()
+	return _instantiate(original_class, overrides, {} if cache_shared else None, _has_class_keys(overrides))
 
-	# Get the constructor arguments
-	signature = inspect.signature(init_method)
-	kwargs = {}
 
-	for name, param in signature.parameters.items():
-		resolved = resolve_dependency(original_class, name, param, overrides)
-		if resolved is not None:
-			kwargs[name] = resolved
-
-	return original_class(**kwargs)
+def _instantiate(
+		original_class: Type[T],
+		overrides: DependencyResolverOverrides,
+		instance_cache: Optional[Dict[Type, Any]],
+		has_class_keys: bool
+) -> T:
+	"""
+	Create a service with dependencies, reusing instances from instance_cache if given.
+	has_class_keys is computed once by the caller, as it is the same for the whole graph.
+	"""
+	# The graph is walked with an explicit stack instead of recursion.
+	# Each frame is [class, resolution plan, index of the next parameter, resolved arguments]
+	stack = [[original_class, _get_resolution_plan(original_class), 0, {}]]
+	in_progress = {original_class}
+
+	while True:
+		frame = stack[-1]
+		cls, plan, index, kwargs = frame
+		names, annotations, defaults, kinds, module_name = (
+			plan.names, plan.annotations, plan.defaults, plan.kinds, plan.module_name
+		)
+
+		dependency = None
+		while index < len(names):
+			name = names[index]
+			create, resolved = _resolve_step(
+				name, annotations[index], defaults[index], kinds[index], module_name, overrides, has_class_keys
+			)
+			index += 1
+			if create:
+				if instance_cache is not None and resolved in instance_cache:
+					kwargs[name] = instance_cache[resolved]
+					continue
+				dependency = resolved
+				break
+			if resolved is not None:
+				kwargs[name] = resolved
+
+		if dependency is not None:
+			# Create the dependency first, then come back to the remaining parameters of this class
+			frame[2] = index
+			if dependency in in_progress:
+				path = [entry[0] for entry in stack] + [dependency]
+				cycle = path[path.index(dependency):]
+				raise CircularDependencyError(
+					"Circular dependency detected: " + " -> ".join(klass.__name__ for klass in cycle)
+				)
+			in_progress.add(dependency)
+			stack.append([dependency, _get_resolution_plan(dependency), 0, {}])
+			continue
+
+		# All arguments are resolved, so the class can be created
+		instance = cls(**kwargs) if kwargs else cls()
+		stack.pop()
+		in_progress.discard(cls)
+		if instance_cache is not None:
+			instance_cache[cls] = instance
+
+		if not stack:
+			return instance
+
+		# Pass the instance to the parameter the parent frame stopped at
+		_, parent_plan, parent_index, parent_kwargs = stack[-1]
+		parent_kwargs[parent_plan.names[parent_index - 1]] = instance
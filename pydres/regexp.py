@@ -2,4 +2,7 @@ import re
 
 from pydres.const import SPECIAL_TYPES
 
-special_type_pattern = re.compile(r'\b(' + '|'.join(SPECIAL_TYPES) + r')\b')
\ No newline at end of file
+special_type_pattern = re.compile(r'\b(' + '|'.join(SPECIAL_TYPES) + r')\b')
+
+# Identifier tokens of an annotation string, matching the word boundaries of special_type_pattern
+_identifier_pattern = re.compile(r'\w+')
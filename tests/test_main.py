@@ -1,10 +1,16 @@
+import builtins
+import gc
+import weakref
 import inspect
+import sys
 from typing import  Any, Optional, Union, List, Dict, Set, Tuple
 from unittest.mock import patch
 
 import pytest
 from datetime import datetime
 
+from pydres.const import BUILTIN_TYPES
+from pydres.exceptions import CircularDependencyError
 from pydres.main import get_first_custom_init, is_custom_class_string_annotation, \
 	resolve_dependency_from_overrides, find_class_in_module, is_builtin_type, is_custom_class, resolve_dependency, \
 	instantiate_with_dependencies
@@ -228,6 +234,9 @@ class TestInstantiateWithDependencies:
 				'Final[str]',
 				'ClassVar[str]',
 				'Protocol',
+				'typing.Optional[str]',
+				'Optional[CustomClass]',
+				'Dict[str,List[int]]',
 			]
 		)
 		def test_should_return_false_for_builtin_type_string_annotations(self, annotation):
@@ -406,12 +415,44 @@ class TestInstantiateWithDependencies:
 
 			# When
 			with pytest.raises(AttributeError) as e:
-				resolve_dependency_from_overrides(original_class, name, param, {})
+				resolve_dependency_from_overrides(original_class, name, param, {C: 'override'})
 
 			# Then
 			assert str(
 				e.value) == "Class 'NonExistentClass' not found in module 'test_main'"
 
+		def test_should_return_override_when_name_in_overrides_with_none_value(self):
+			# Given
+			signature = inspect.signature(AWithDirectTypeAnnotation.__init__)
+			name, param = list(signature.parameters.items())[1]
+
+			# When
+			result = resolve_dependency_from_overrides(AWithDirectTypeAnnotation, name, param, {'b': None, B: 'override'})
+
+			# Then
+			assert result is None
+
+		@pytest.mark.parametrize(
+			'overrides',
+			[
+				{},
+				{'unrelated': 'override'},
+			]
+		)
+		def test_should_not_resolve_string_reference_when_no_class_in_overrides(self, overrides):
+			# Given
+			signature = inspect.signature(AWithStringAnnotation.__init__)
+			name, param = list(signature.parameters.items())[1]
+
+			# The reference can not be resolved, so it must not be looked up when no override is keyed by class
+			param._annotation = "NonExistentClass"
+
+			# When
+			result = resolve_dependency_from_overrides(AWithStringAnnotation, name, param, overrides)
+
+			# Then
+			assert result is None
+
 	class TestFindClassInModule:
 
 		def test_should_return_found_class_which_defined_in_module(self):
@@ -446,6 +487,30 @@ class TestInstantiateWithDependencies:
 			assert str(
 				e.value) == "Found 'sample_const' in module 'test_main', but it is not a class."
 
+		def test_should_not_import_module_when_already_loaded(self):
+			with patch('pydres.main.importlib.import_module') as mock_import:
+				# When
+				result = find_class_in_module(AWithDirectTypeAnnotation, 'C')
+
+				# Then
+				assert result == C
+				mock_import.assert_not_called()
+
+		def test_should_return_class_rebound_in_module(self):
+			# Given
+			class FakeC:
+				pass
+
+			find_class_in_module(AWithStringAnnotation, 'C')
+
+			with patch.object(sys.modules[C.__module__], 'C', FakeC):
+				# When
+				result = find_class_in_module(AWithStringAnnotation, 'C')
+
+			# Then
+			assert result is FakeC
+			assert find_class_in_module(AWithStringAnnotation, 'C') is C
+
 	class TestIsBuiltinType:
 		@pytest.mark.parametrize(
 			'builtin_type',
@@ -481,6 +546,15 @@ class TestInstantiateWithDependencies:
 			# Then
 			assert result is False
 
+		def test_should_cover_every_type_in_builtins_module(self):
+			# Given
+			builtin_type_names = {
+				type_.__name__ for type_ in vars(builtins).values() if isinstance(type_, type)
+			}
+
+			# Then
+			assert builtin_type_names <= BUILTIN_TYPES
+
 	class TestIsCustomClass:
 
 		def test_should_return_true_for_custom_class(self):
@@ -541,90 +615,192 @@ class TestInstantiateWithDependencies:
 			# Then
 			assert result is None
 
-		def test_should_return_override_value_when_resolve_dependency_from_overrides_return_value(self):
-			with patch('pydres.main.resolve_dependency_from_overrides') as mock_resolve:
+		def test_should_return_override_value_when_name_in_overrides(self):
+			# Given
+			params = inspect.signature(B.__init__).parameters
+			name, param = list(params.items())[1]
+
+			# When
+			result = resolve_dependency(B, name, param, {'c': 'override'})
+
+			# Then
+			assert result == 'override'
+
+		def test_should_return_override_value_when_referenced_class_in_overrides(self):
+			# Given
+			params = inspect.signature(B.__init__).parameters
+			name, param = list(params.items())[1]
+
+			# When
+			result = resolve_dependency(B, name, param, {C: 'override'})
+
+			# Then
+			assert result == 'override'
+
+		def test_should_instantiate_referenced_class_when_is_custom_class_string_annotation(self):
+			with patch('pydres.main.instantiate_with_dependencies') as mock_instantiate:
 				# Given
-				mock_resolve.return_value = 'override'
-				params = inspect.signature(B.__init__).parameters
+				params = inspect.signature(AWithStringAnnotation.__init__).parameters
 				name, param = list(params.items())[1]
 
 				# When
-				result = resolve_dependency(B, name, param, {})
+				resolve_dependency(AWithStringAnnotation, name, param, {})
 
 				# Then
-				assert result == 'override'
+				mock_instantiate.assert_called_once_with(B, {})
 
-		def test_should_call_find_class_in_module_when_is_custom_class_string_annotation_return_true(self):
-			with patch('pydres.main.resolve_dependency_from_overrides') as mock_resolve:
+		def test_should_call_instantiate_with_dependencies_when_is_custom_class_return_true(self):
+			with patch('pydres.main.instantiate_with_dependencies') as mock_instantiate:
 				# Given
-				mock_resolve.return_value = None
-				with patch('pydres.main.find_class_in_module') as mock_find:
-					# Given
-					params = inspect.signature(AWithStringAnnotation.__init__).parameters
-					name, param = list(params.items())[1]
+				params = inspect.signature(AWithDirectTypeAnnotation.__init__).parameters
+				name, param = list(params.items())[1]
 
-					# When
-					resolve_dependency(AWithStringAnnotation, name, param, {})
+				# When
+				resolve_dependency(AWithDirectTypeAnnotation, name, param, {})
 
-					# Then
-					mock_find.assert_called_once_with(AWithStringAnnotation, 'B')
+				# Then
+				mock_instantiate.assert_called_once_with(B, {})
 
-		def test_should_call_instantiate_with_dependencies_when_is_custom_class_return_true(self):
-			with patch('pydres.main.resolve_dependency_from_overrides') as mock_resolve:
-				# Given
-				mock_resolve.return_value = None
-				with patch(
-						'pydres.main.is_custom_class_string_annotation') as mock_is_custom_string_class:
-					mock_is_custom_string_class.return_value = False
-					with patch(
-							'pydres.main.instantiate_with_dependencies') as mock_instantiate:
-						# Given
-						params = inspect.signature(AWithDirectTypeAnnotation.__init__).parameters
-						name, param = list(params.items())[1]
-
-						# When
-						resolve_dependency(AWithDirectTypeAnnotation, name, param, {})
-
-						# Then
-						mock_instantiate.assert_called_once_with(B, {})
+		def test_should_reuse_instance_from_instance_cache(self):
+			# Given
+			cached = C()
+			params = inspect.signature(B.__init__).parameters
+			name, param = list(params.items())[1]
+
+			# When
+			result = resolve_dependency(B, name, param, {}, {C: cached})
+
+			# Then
+			assert result is cached
+
+		def test_should_store_created_instance_in_instance_cache(self):
+			# Given
+			instance_cache = {}
+			params = inspect.signature(AWithDirectTypeAnnotation.__init__).parameters
+			name, param = list(params.items())[1]
+
+			# When
+			result = resolve_dependency(AWithDirectTypeAnnotation, name, param, {}, instance_cache)
+
+			# Then
+			assert instance_cache[B] is result
+			assert instance_cache[C] is result.c
+
+		def test_should_create_referenced_class_with_overrides_when_class_in_overrides(self):
+			# Given
+			params = inspect.signature(AWithStringAnnotation.__init__).parameters
+			name, param = list(params.items())[1]
+
+			# When
+			result = resolve_dependency(AWithStringAnnotation, name, param, {C: 'override'})
+
+			# Then
+			assert isinstance(result, B)
+			assert result.c == 'override'
 
 		def test_should_return_default_value_when_param_default_is_not_param_empty(self):
-			with patch('pydres.main.resolve_dependency_from_overrides') as mock_resolve:
-				# Given
-				mock_resolve.return_value = None
-				with patch(
-						'pydres.main.is_custom_class_string_annotation') as mock_is_custom_string_class:
-					mock_is_custom_string_class.return_value = False
-					with patch(
-							'pydres.main.is_custom_class') as mock_is_custom_class:
-						mock_is_custom_class.return_value = False
-						params = inspect.signature(B.__init__).parameters
-						name, param = list(params.items())[2]
-
-						# When
-						result = resolve_dependency(B, name, param, {})
-
-						# Then
-						assert result == 'default message'
+			# Given
+			params = inspect.signature(B.__init__).parameters
+			name, param = list(params.items())[2]
+
+			# When
+			result = resolve_dependency(B, name, param, {})
+
+			# Then
+			assert result == 'default message'
 
 		def test_should_return_none_when_default_value_is_not_set(self):
-			with patch('pydres.main.resolve_dependency_from_overrides') as mock_resolve:
-				# Given
-				mock_resolve.return_value = None
-				with patch(
-						'pydres.main.is_custom_class_string_annotation') as mock_is_custom_string_class:
-					mock_is_custom_string_class.return_value = False
-					with patch(
-							'pydres.main.is_custom_class') as mock_is_custom_class:
-						mock_is_custom_class.return_value = False
-						params = inspect.signature(B.__init__).parameters
-						name, param = list(params.items())[0]
-
-						# When
-						result = resolve_dependency(B, name, param, {})
-
-						# Then
-						assert result is None
+			# Given
+			def init(self, count: int):
+				pass
+
+			name, param = list(inspect.signature(init).parameters.items())[1]
+
+			# When
+			result = resolve_dependency(B, name, param, {})
+
+			# Then
+			assert result is None
+
+		def test_should_fall_back_to_default_when_override_is_none(self):
+			# Given
+			params = inspect.signature(B.__init__).parameters
+			name, param = list(params.items())[2]
+
+			# When
+			result = resolve_dependency(B, name, param, {'message': None})
+
+			# Then
+			assert result == 'default message'
+
+	class TestResolutionPlan:
+
+		def test_should_use_explicit_signature_when_defined(self):
+			# Given
+			def init(self, *args, **kwargs):
+				self.b = kwargs['b']
+
+			init.__signature__ = inspect.Signature([
+				inspect.Parameter('self', inspect.Parameter.POSITIONAL_OR_KEYWORD),
+				inspect.Parameter('b', inspect.Parameter.KEYWORD_ONLY, annotation=B),
+			])
+			TestClass = type('TestClass', (), {'__init__': init})
+
+			# When
+			result = instantiate_with_dependencies(TestClass)
+
+			# Then
+			assert isinstance(result.b, B)
+
+		def test_should_not_build_signature_when_init_takes_only_self(self):
+			# Given
+			class TestClass:
+				def __init__(self):
+					self.a = 1
+
+			with patch('inspect.signature') as mock_signature:
+				# When
+				result = instantiate_with_dependencies(TestClass)
+
+				# Then
+				assert result.a == 1
+				mock_signature.assert_not_called()
+
+		@pytest.mark.parametrize(
+			'init_method',
+			[
+				lambda self, a=1: None,
+				lambda self, **kwargs: None,
+				lambda self, *, a=1: None,
+			]
+		)
+		def test_should_build_signature_when_init_takes_more_than_self(self, init_method):
+			# Given
+			TestClass = type('TestClass', (), {'__init__': init_method})
+
+			with patch('inspect.signature', wraps=inspect.signature) as mock_signature:
+				# When
+				result = instantiate_with_dependencies(TestClass)
+
+				# Then
+				assert isinstance(result, TestClass)
+				mock_signature.assert_called_once_with(init_method)
+
+		def test_should_build_signature_only_once_per_class(self):
+			# Given
+			class TestClass:
+				def __init__(self, c: C):
+					self.c = c
+
+			instantiate_with_dependencies(TestClass)
+
+			with patch('inspect.signature') as mock_signature:
+				# When
+				result = instantiate_with_dependencies(TestClass)
+
+				# Then
+				assert isinstance(result.c, C)
+				mock_signature.assert_not_called()
 
 	class TestInstantiateWithDependencies:
 
@@ -792,11 +968,197 @@ class TestInstantiateWithDependencies:
 
 		def test_should_raise_error_for_circular_dependencies(self):
 			# When
-			with pytest.raises(RecursionError) as e:
+			with pytest.raises(CircularDependencyError) as e:
 				instantiate_with_dependencies(J)
 
 			# Then
-			assert "maximum recursion depth exceeded" in str(e.value)
+			assert isinstance(e.value, RecursionError)
+			assert str(e.value) == "Circular dependency detected: J -> K -> J"
+
+		def test_should_not_raise_error_for_circular_dependencies_broken_by_override(self):
+			# Given
+			overrides = {
+				J: 'override'
+			}
+
+			# When
+			result = instantiate_with_dependencies(J, {'k': K(j='override')})
+			result_by_type = instantiate_with_dependencies(K, overrides)
+
+			# Then
+			assert result.k.j == 'override'
+			assert result_by_type.j == 'override'
+
+		def test_should_resolve_dependency_chain_deeper_than_recursion_limit(self):
+			# Given
+			dependency = C
+			for i in range(sys.getrecursionlimit() + 100):
+				def __init__(self, dep: dependency):
+					self.dep = dep
+
+				dependency = type(f'Deep{i}', (), {'__init__': __init__})
+
+			# When
+			result = instantiate_with_dependencies(dependency)
+
+			# Then
+			for _ in range(sys.getrecursionlimit() + 100):
+				result = result.dep
+			assert isinstance(result, C)
+
+		def test_should_resolve_string_annotation_defined_after_first_instantiation(self, monkeypatch):
+			# Given
+			class M:
+				def __init__(self, n: 'LateDefinedClass'):
+					self.n = n
+
+			with pytest.raises(AttributeError):
+				instantiate_with_dependencies(M)
+
+			class LateDefinedClass:
+				pass
+
+			monkeypatch.setattr(sys.modules[M.__module__], 'LateDefinedClass', LateDefinedClass, raising=False)
+
+			# When
+			result = instantiate_with_dependencies(M)
+
+			# Then
+			assert isinstance(result.n, LateDefinedClass)
+
+		def test_should_create_new_instance_for_each_dependency_by_default(self):
+			# Given
+			class P:
+				def __init__(self, first: C, second: 'C'):
+					self.first = first
+					self.second = second
+
+			# When
+			result = instantiate_with_dependencies(P)
+
+			# Then
+			assert result.first is not result.second
+
+		def test_should_share_instance_across_dependencies_when_cache_shared(self):
+			# Given
+			class P:
+				def __init__(self, b: B, c: C):
+					self.b = b
+					self.c = c
+
+			# When
+			result = instantiate_with_dependencies(P, cache_shared=True)
+
+			# Then
+			assert result.b.c is result.c
+
+		def test_should_use_default_when_string_annotation_refers_to_builtin_type(self, monkeypatch):
+			# Given
+			class Q:
+				def __init__(self, a: 'IntAlias' = 5):
+					self.a = a
+
+			monkeypatch.setattr(sys.modules[Q.__module__], 'IntAlias', int, raising=False)
+
+			# When
+			result = instantiate_with_dependencies(Q)
+
+			# Then
+			assert result.a == 5
+
+		def test_should_not_keep_classes_alive_after_instantiation(self):
+			# Given
+			class Dep:
+				pass
+
+			class Base:
+				def __init__(self):
+					self.created = True
+
+			class Svc(Base):
+				def __init__(self, dep: Dep):
+					super().__init__()
+					self.dep = dep
+
+			instantiate_with_dependencies(Svc)
+			dep_ref = weakref.ref(Dep)
+			svc_ref = weakref.ref(Svc)
+
+			# When
+			del Dep, Base, Svc
+			# Dep is released by the cached plan of Svc, so it is only freed by the next collection
+			gc.collect()
+			gc.collect()
+
+			# Then
+			assert dep_ref() is None
+			assert svc_ref() is None
+
+		def test_should_use_replaced_init_after_first_instantiation(self):
+			# Given
+			class Svc:
+				def __init__(self, d: C):
+					self.d = d
+
+			instantiate_with_dependencies(Svc)
+
+			def new_init(self, x: int = 7):
+				self.x = x
+
+			with patch.object(Svc, '__init__', new_init):
+				# When
+				result = instantiate_with_dependencies(Svc)
+
+			# Then
+			assert vars(result) == {'x': 7}
+
+		def test_should_use_init_replaced_on_base_class_after_first_instantiation(self):
+			# Given
+			class Base:
+				def __init__(self, d: C):
+					self.d = d
+
+			class Svc(Base):
+				pass
+
+			instantiate_with_dependencies(Svc)
+
+			def new_init(self, x: int = 7):
+				self.x = x
+
+			with patch.object(Base, '__init__', new_init):
+				# When
+				result = instantiate_with_dependencies(Svc)
+
+			# Then
+			assert vars(result) == {'x': 7}
+
+		def test_should_not_walk_mro_when_instantiating_same_class_again(self):
+			# Given
+			instantiate_with_dependencies(B)
+
+			with patch('pydres.main.get_first_custom_init') as mock_get_init:
+				# When
+				result = instantiate_with_dependencies(B)
+
+				# Then
+				assert isinstance(result.c, C)
+				mock_get_init.assert_not_called()
+
+		def test_should_use_class_patched_in_module_for_string_annotation(self):
+			# Given
+			class FakeC:
+				pass
+
+			instantiate_with_dependencies(B)
+
+			with patch.object(sys.modules[B.__module__], 'C', FakeC):
+				# When
+				result = instantiate_with_dependencies(B)
+
+			# Then
+			assert isinstance(result.c, FakeC)
+			assert isinstance(instantiate_with_dependencies(B).c, C)
 
 		def test_should_return_override_for_special_type_specified_by_param_name(self):
 			# Given